@@ -10,10 +10,10 @@ structured data classes for better type safety and data handling.
 """
 
 import enum
-from typing import Dict, List, Optional, Tuple, Any
-from datetime import datetime
-
-from pydantic import BaseModel, Field, validator
+import io
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, TextIO, Any
 
 class SegmentHeader(enum.Enum):
     InterchangeControl = "ISA"
@@ -79,6 +79,348 @@ class HierarchicalLevelCode(enum.Enum):
     Subscriber = "22"
     Dependent = "23"
 
+# Enum values used by the segment builders, resolved once at import
+_NM1 = SegmentHeader.Name.value
+_N3 = SegmentHeader.AddressLine1.value
+_N4 = SegmentHeader.CityStatePostalCode.value
+_PRV_SEG = SegmentHeader.Provider.value
+_PER = SegmentHeader.ContactInformation.value
+_REF = SegmentHeader.Reference.value
+_SBR = SegmentHeader.SubscriberInformation.value
+_DMG = SegmentHeader.Demographics.value
+_DTP = SegmentHeader.DateTimePeriod.value
+_SV1 = SegmentHeader.ServiceLine.value
+_LX = SegmentHeader.ServiceLineNumber.value
+_CLM = SegmentHeader.Claim.value
+_HI = SegmentHeader.HealthCareInformation.value
+_SE = SegmentHeader.TransactionSetTrailer.value
+_GE = SegmentHeader.FunctionalGroupTrailer.value
+_IEA = SegmentHeader.InterchangeControlTrailer.value
+_PAYER = SegmentHeader.Payer.value
+_BI = ProviderType.Billing.value
+_PXC = ReferenceIdentificationQualifier.TaxonomyCode.value
+_EI = ReferenceIdentificationQualifier.EmployerIdentificationNumber.value
+_XX = ReferenceIdentificationQualifier.NationalProviderIdentifier.value
+_MI = ReferenceIdentificationQualifier.MemberId.value
+_SELF = RelationshipToSubscriber.Self.value
+_PRIMARY = PaymentResponsibilityLevelCode.Primary.value
+_EIC_BILLING_PROVIDER = EntityIdentifierCode.BillingProvider.value
+_EIC_SUBSCRIBER = EntityIdentifierCode.Subscriber.value
+_EIC_PATIENT = EntityIdentifierCode.Patient.value
+_EIC_SUBMITTER = EntityIdentifierCode.Submitter.value
+_EIC_RECEIVER = EntityIdentifierCode.Receiver.value
+
+# Hardcoded header: ISA, GS, ST, BHT, submitter and receiver segments
+_HEADER_SEGMENTS = (
+    "ISA*00*          *00*          *ZZ*AV09311993     *01*030240928      *240702*1531*^*00501*415133923*0*P*>~",
+    "GS*HC*1923294*030240928*20240702*1533*415133923*X*005010X222A1~",
+    "ST*837*415133923*005010X222A1~",
+    "BHT*0019*00*1*20240702*1531*CH~",
+    "NM1*41*2*Mattel Industries*****46*1234567890~",
+    "PER*IC*Ruth Handler*TE*8458130000~",
+    "NM1*40*2*AVAILITY 5010*****46*030240928~",
+)
+# The header is emitted as one pre-joined entry that stands for several segments
+_HEADER = "\n".join(_HEADER_SEGMENTS)
+_HEADER_SEGMENT_COUNT = len(_HEADER_SEGMENTS)
+
+# Hardcoded subscriber (22) and dependent (23) hierarchical levels. The last
+# element is the hierarchical child code: 1 when a dependent loop follows.
+_HL_SUBSCRIBER = "HL*2*1*22*0~"
+_HL_SUBSCRIBER_WITH_DEPENDENT = "HL*2*1*22*1~"
+_HL_DEPENDENT = "HL*3*2*23*0~"
+
+# Billing provider segment templates; N3 always carries the second address element
+_PRV_BILLING_TMPL = f"{_PRV_SEG}*{_BI}*{_PXC}*%s~"
+_REF_EI_TMPL = f"{_REF}*{_EI}*%s~"
+_PER_TMPL = f"{_PER}*IC*%s*TE*%s~"
+
+# Subscriber and dependent segment templates; SBR elements 4-8 are always empty
+_SBR_TMPL = f"{_SBR}*%s*%s*******%s~"
+_NM1_PATIENT_TMPL = f"{_NM1}*{_EIC_PATIENT}*1*%s*%s~"
+
+# Claim segment templates; the facility code qualifier is hardcoded to B for professional claims
+_CLM_TMPL = f"{_CLM}*%s*%s***%s>B>%s*%s*%s*%s*%s~"
+_REF_PRIOR_AUTH_TMPL = f"{_REF}*G1*%s~"
+_HI_TMPL = f"{_HI}*%s~"
+_DIAGNOSIS_TMPL = "%s>%s"
+
+# Address and demographics segment templates
+_N3_TMPL = f"{_N3}*%s~"
+_N3_ADDR2_TMPL = f"{_N3}*%s*%s~"
+_N4_TMPL = f"{_N4}*%s*%s*%s~"
+_DMG_TMPL = f"{_DMG}*D8*%s*%s~"
+
+# Address keys a record must supply for its N3 and N4 segments
+_REQUIRED_ADDRESS_FIELDS = ("address1", "city", "state", "postalCode")
+
+# Service line templates; the charge is written as given and units always carry ".0"
+_LX_TMPL = f"{_LX}*%d~"
+_SV1_TMPL = f"{_SV1}*HC>%s*%s*UN*%s.0***1~"
+_DTP_SERVICE_TMPL = f"{_DTP}*472*D8*%s~"
+
+# Write buffer for to_file, so segments reach the disk in large chunks
+_FILE_BUFFER_SIZE = 1 << 20
+
+# Rendering provider specialty segment
+_PRV_RENDERING_TMPL = f"{_PRV_SEG}*PE*{_PXC}*%s~"
+
+# Hardcoded trailer control numbers
+_CONTROL_NUMBER = "415133923"
+_SE_TMPL = f"{_SE}*%d*{_CONTROL_NUMBER}~"
+_GE_SEGMENT = f"{_GE}*1*{_CONTROL_NUMBER}~"
+_IEA_SEGMENT = f"{_IEA}*1*{_CONTROL_NUMBER}~"
+
+# NM1 segment templates for person (1) and non-person (2) entities
+_NM1_PERSON = f"{_NM1}*%s*1*%s*%s*%s*%s*%s*%s*%s~"
+_NM1_ORG = f"{_NM1}*%s*2*%s*****%s*%s~"
+_NM1_PAYER_TMPL = f"{_NM1}*{_PAYER}*2*%s*****PI*%s~"
+
+# Name segment details per context:
+# (entity identifier code, entity type qualifier, id attribute, id code qualifier).
+# An entity type of None means it is derived from the data (organizationName present).
+_NAME_CTX = {
+    'billing_provider': (_EIC_BILLING_PROVIDER, None, 'npi', _XX),
+    'rendering_provider': ("82", None, 'npi', _XX),
+    'service_facility': ("77", "2", 'npi', _XX),
+    'subscriber': (_EIC_SUBSCRIBER, None, 'memberId', _MI),
+    'patient': (_EIC_PATIENT, "1", None, None),  # Patients typically don't need identification
+    'payer': ("PR", "2", 'payerId', "PI"),
+    'submitter': (_EIC_SUBMITTER, "2", 'id', "46"),
+    'receiver': (_EIC_RECEIVER, "2", 'id', "46"),
+}
+_NAME_CTX_DEFAULT = (_EIC_BILLING_PROVIDER, None, None, None)
+
+# Contexts whose NM1 segment is written only once per NPI
+_PROVIDER_CTXS = frozenset({"billing_provider", "rendering_provider", "service_facility"})
+
+# Element, segment and sub-element delimiters must not appear inside field values
+_EDI_SANITIZE_TABLE = str.maketrans({'*': ' ', '~': ' ', '>': ' '})
+
+def _sanitize(value: Any) -> Optional[str]:
+    """Render a user-supplied value as text with EDI delimiter characters replaced by spaces."""
+    if value is None:
+        return None
+    return str(value).translate(_EDI_SANITIZE_TABLE)
+
+def _intern_code(value: Any) -> Optional[str]:
+    """Intern a short code, rendering non-string values such as JSON numbers as text first."""
+    if value is None:
+        return None
+    return sys.intern(str(value))
+
+# Address keys that are flattened onto provider, subscriber and facility records
+_ADDRESS_FIELDS = ("address1", "address2", "city", "state", "postalCode")
+
+def _address_fields(address: Optional[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+    """Pick the known address keys out of an address dict for a record constructor."""
+    if not address:
+        return dict.fromkeys(_ADDRESS_FIELDS)
+    return {key: _sanitize(address.get(key)) for key in _ADDRESS_FIELDS}
+
+def _missing_address_fields(address: Optional[Dict[str, Any]]) -> List[str]:
+    """Return the required N3/N4 address keys that an address dict does not supply."""
+    if not address:
+        return list(_REQUIRED_ADDRESS_FIELDS)
+    return [key for key in _REQUIRED_ADDRESS_FIELDS if address.get(key) is None]
+
+@dataclass(slots=True)
+class Provider:
+    """Billing provider record."""
+    npi: str
+    taxonomyCode: str
+    employerId: str
+    address1: Optional[str] = None
+    address2: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    postalCode: Optional[str] = None
+    organizationName: Optional[str] = None
+    lastName: Optional[str] = None
+    firstName: Optional[str] = None
+    contactInfo: Optional[Dict] = None
+
+@dataclass(slots=True)
+class Subscriber:
+    """Subscriber (or dependent patient) record."""
+    memberId: str
+    lastName: str
+    firstName: str
+    birthDate: str
+    gender: str
+    billingProviderIndex: int
+    paymentResponsibilityLevelCode: str
+    claimFilingCode: str
+    address1: Optional[str] = None
+    address2: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    postalCode: Optional[str] = None
+    is_dependent: bool = False
+    relationship_to_subscriber: str = ''
+
+@dataclass(slots=True)
+class RenderingProvider:
+    """Rendering provider record."""
+    npi: str
+    lastName: str
+    firstName: str
+    taxonomyCode: str
+    employerId: str
+
+@dataclass(slots=True)
+class ServiceFacility:
+    """Service facility location record."""
+    npi: str
+    organizationName: str
+    address1: Optional[str] = None
+    address2: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    postalCode: Optional[str] = None
+
+@dataclass(slots=True)
+class ClaimInfo:
+    """Claim (CLM) information record."""
+    subscriberIndex: int
+    patientControlNumber: str
+    claimChargeAmount: float
+    placeOfServiceCode: str
+    claimFrequencyCode: str = "1"
+    signatureIndicator: str = "Y"
+    planParticipationCode: str = "A"
+    releaseInfoCode: str = "Y"
+    benefitsAssignment: str = "Y"
+    diagnosisCodes: List[Dict[str, str]] = field(default_factory=list)
+
+@dataclass(slots=True)
+class Payer:
+    """Payer (insurance company) record."""
+    organizationName: str
+    payerId: str
+
+@dataclass(slots=True)
+class ServiceLine:
+    """Professional service line record."""
+    subscriberIndex: int
+    patientIndex: Optional[int]
+    procedureCode: str
+    modifierCodes: List[str]
+    chargeAmount: float
+    units: int
+    serviceDate: str
+    renderingProviderIndex: Optional[int] = None
+
+class _SegmentWriter:
+    """
+    Streams segments to a text stream, newline separated, counting them as it goes.
+    
+    Supports the append/extend/+= subset of list that the segment builders use, so the
+    builders write straight to the destination instead of materializing a list.
+    """
+    __slots__ = ("_write", "count")
+
+    def __init__(self, stream: TextIO):
+        self._write = stream.write
+        self.count = 0
+
+    def write_block(self, block: str, segment_count: int) -> None:
+        """Write a pre-joined block that holds segment_count segments."""
+        if self.count:
+            self._write("\n")
+        self._write(block)
+        self.count += segment_count
+
+    def append(self, segment: str) -> None:
+        """Write a single segment."""
+        if self.count:
+            self._write("\n")
+        self._write(segment)
+        self.count += 1
+
+    def extend(self, segments: Iterable[str]) -> None:
+        """Write several segments in order."""
+        for segment in segments:
+            self.append(segment)
+
+    def __iadd__(self, segments: Iterable[str]) -> '_SegmentWriter':
+        self.extend(segments)
+        return self
+
+def _emit_service_line_dtp(service: ServiceLine, number: int, out: _SegmentWriter) -> None:
+    """Append LX, SV1 and DTP segments for a service line without modifiers."""
+    out.append(_LX_TMPL % number)
+    out.append(_SV1_TMPL % (service.procedureCode, service.chargeAmount, service.units))
+    out.append(_DTP_SERVICE_TMPL % service.serviceDate)
+
+def _emit_service_line_mod_dtp(service: ServiceLine, number: int, out: _SegmentWriter) -> None:
+    """Append LX, SV1 and DTP segments for a service line with modifiers."""
+    out.append(_LX_TMPL % number)
+    procedure = ":".join((service.procedureCode, *service.modifierCodes))
+    out.append(_SV1_TMPL % (procedure, service.chargeAmount, service.units))
+    out.append(_DTP_SERVICE_TMPL % service.serviceDate)
+
+def _emit_service_line_nodtp(service: ServiceLine, number: int, out: _SegmentWriter) -> None:
+    """Append LX and SV1 segments for a service line without modifiers or date."""
+    out.append(_LX_TMPL % number)
+    out.append(_SV1_TMPL % (service.procedureCode, service.chargeAmount, service.units))
+
+def _emit_service_line_mod_nodtp(service: ServiceLine, number: int, out: _SegmentWriter) -> None:
+    """Append LX and SV1 segments for a service line with modifiers and no date."""
+    out.append(_LX_TMPL % number)
+    procedure = ":".join((service.procedureCode, *service.modifierCodes))
+    out.append(_SV1_TMPL % (procedure, service.chargeAmount, service.units))
+
+def _emit_address_dmg(record: Any, out: _SegmentWriter) -> None:
+    """Append N3, N4 and DMG segments for the person a claim is for."""
+    missing = [key for key in _REQUIRED_ADDRESS_FIELDS if getattr(record, key) is None]
+    if missing:
+        raise ValueError(
+            f"Address for member {getattr(record, 'memberId', '')} is missing {', '.join(missing)}"
+        )
+    out += (
+        _N3_TMPL % record.address1,
+        _N4_TMPL % (record.city, record.state, record.postalCode),
+        _DMG_TMPL % (record.birthDate, record.gender),
+    )
+
+def _emit_n3n4_with_addr2(record: Any, out: _SegmentWriter) -> None:
+    """Append N3 (with second address line) and N4 segments for a record with a complete address."""
+    out.append(_N3_ADDR2_TMPL % (record.address1, record.address2))
+    out.append(_N4_TMPL % (record.city, record.state, record.postalCode))
+
+def _emit_n3n4_no_addr2(record: Any, out: _SegmentWriter) -> None:
+    """Append N3 and N4 segments for a record with a complete single-line address."""
+    out.append(_N3_TMPL % record.address1)
+    out.append(_N4_TMPL % (record.city, record.state, record.postalCode))
+
+def _emit_partial_address(record: Any, out: _SegmentWriter) -> None:
+    """Append whichever of the N3/N4 segments a record with an incomplete address supports."""
+    if record.address1 is not None:
+        if record.address2:
+            out.append(_N3_ADDR2_TMPL % (record.address1, record.address2))
+        else:
+            out.append(_N3_TMPL % record.address1)
+
+    # City, State, ZIP
+    if record.city is not None and record.state is not None and record.postalCode is not None:
+        out.append(_N4_TMPL % (record.city, record.state, record.postalCode))
+
+def _select_address_emitter(record: Any) -> Callable[[Any, _SegmentWriter], None]:
+    """Pick the N3/N4 emitter specialized on which of the record's address fields are present."""
+    if (record.address1 is not None and record.city is not None
+            and record.state is not None and record.postalCode is not None):
+        return _emit_n3n4_with_addr2 if record.address2 else _emit_n3n4_no_addr2
+    return _emit_partial_address
+
+# Service line emitters keyed on (has modifier codes, has service date)
+_SERVICE_LINE_EMITTERS = {
+    (False, True): _emit_service_line_dtp,
+    (True, True): _emit_service_line_mod_dtp,
+    (False, False): _emit_service_line_nodtp,
+    (True, False): _emit_service_line_mod_nodtp,
+}
+
 class EDI837Builder:
     """
     A class for building EDI 837 healthcare claim files.
@@ -115,6 +457,11 @@ class EDI837Builder:
         self.patients = []
         self.service_lines = []
         self.rendering_providers = []
+        self.claim_information = None
+        self.service_facility = None
+        self.prior_authorization = None
+        self.payer_info = None
+        self._facility_address_emitter = None
             
         # Tracking for hierarchical levels
         self.hl_count = 0
@@ -123,10 +470,13 @@ class EDI837Builder:
         self.contact_info_map = {}
         self.segment_count = 1
 
-        #Provider Maps
-        self.provider_map = {}
+        # NPIs of providers whose NM1 segment has already been written; reset by every _emit
+        self.seen_provider_npis = set()
         self.has_dependents = False
 
+        # Subscriber indices grouped by billing provider index
+        self._subs_by_provider: Dict[int, List[int]] = {}
+
     def add_billing_provider(self, 
                            npi: str,
                            taxonomy_code: str,
@@ -151,27 +501,34 @@ class EDI837Builder:
         Returns:
             int: Index of the billing provider in the internal list
         """
-        provider = {
-            "npi": npi,
-            "taxonomyCode": taxonomy_code,
-            "employerId": employer_id,
-            "address": address
-        }
+        missing = _missing_address_fields(address)
+        if missing:
+            raise ValueError(f"Billing provider {npi} address is missing {', '.join(missing)}")
+        
+        provider = Provider(
+            npi=npi,
+            taxonomyCode=_intern_code(taxonomy_code),
+            employerId=employer_id,
+            **_address_fields(address)
+        )
+        if provider.state is not None:
+            provider.state = _intern_code(provider.state)
+        # The billing N3 segment always carries the second address element
+        if provider.address2 is None:
+            provider.address2 = ""
         
         if organization_name:
-            provider["organizationName"] = organization_name
+            provider.organizationName = _sanitize(organization_name)
         else:
-            provider["lastName"] = last_name
-            provider["firstName"] = first_name
+            provider.lastName = _sanitize(last_name)
+            provider.firstName = _sanitize(first_name)
 
         if contactInfo: 
-            
-            name = contactInfo.get("name", "")
-            phone_number = contactInfo.get("phoneNumber", "")
-            key_to_check = f"{name}_{phone_number})"
-            if not  key_to_check in self.contact_info_map: 
+            get = contactInfo.get
+            key_to_check = (_sanitize(get("name", "")), _sanitize(get("phoneNumber", "")))
+            if key_to_check not in self.contact_info_map: 
                 self.contact_info_map[key_to_check] = "billing"
-                provider["contactInfo"] = contactInfo
+                provider.contactInfo = {"name": key_to_check[0], "phoneNumber": key_to_check[1]}
                 
         self.billing_providers.append(provider)
         return len(self.billing_providers) - 1
@@ -208,22 +565,24 @@ class EDI837Builder:
         if is_dependent: 
             self.has_dependents = True
         
-        subscriber = {
-            "memberId": member_id,
-            "lastName": last_name,
-            "firstName": first_name,
-            "address": address,
-            "birthDate": birth_date,
-            "gender": gender,
-            "billingProviderIndex": billing_provider_index,
-            "paymentResponsibilityLevelCode": payment_responsibility_code.value,
-            "claimFilingCode": claim_filing_code.value,
-            "is_dependent": is_dependent,
-            "relationship_to_subscriber" : relationship_to_subscriber
-        }
+        subscriber = Subscriber(
+            memberId=member_id,
+            lastName=_sanitize(last_name),
+            firstName=_sanitize(first_name),
+            **_address_fields(address),
+            birthDate=birth_date,
+            gender=gender,
+            billingProviderIndex=billing_provider_index,
+            paymentResponsibilityLevelCode=payment_responsibility_code.value,
+            claimFilingCode=claim_filing_code.value,
+            is_dependent=is_dependent,
+            relationship_to_subscriber=relationship_to_subscriber
+        )
         
+        subscriber_index = len(self.subscribers)
         self.subscribers.append(subscriber)
-        return len(self.subscribers) - 1
+        self._subs_by_provider.setdefault(billing_provider_index, []).append(subscriber_index)
+        return subscriber_index
     
     def add_submitter(self,  
                       contactInfo: Optional[Dict] = None):
@@ -231,10 +590,9 @@ class EDI837Builder:
         # We use this to start building a discrete list of contactInfos for providers.
         self.submitter =  contactInfo;
         if contactInfo:
-            name = contactInfo.get("name", "")
-            phone_number = contactInfo.get("phoneNumber", "")
-            key_to_check = f"{name}_{phone_number})"
-            if not  key_to_check in self.contact_info_map: 
+            get = contactInfo.get
+            key_to_check = (_sanitize(get("name", "")), _sanitize(get("phoneNumber", "")))
+            if key_to_check not in self.contact_info_map: 
                 self.contact_info_map[key_to_check] = "submitter"
             
     def add_payer(self, 
@@ -252,15 +610,11 @@ class EDI837Builder:
         Returns:
             The builder instance for method chaining
         """
-        # Initialize payer_info dictionary if it doesn't exist
-        if not hasattr(self, 'payer_info'):
-            self.payer_info = {}
-        
         # Store payer information indexed by subscriber
-        self.payer_info = {
-            'organizationName': payer_name,
-            'payerId': payer_id
-        }
+        self.payer_info = Payer(
+            organizationName=_sanitize(payer_name),
+            payerId=payer_id
+        )
   
     def add_service_facility_location(self,
                                     npi: str,
@@ -282,11 +636,12 @@ class EDI837Builder:
         Returns:
             The builder instance for method chaining
         """
-        self.service_facility = {
-            "npi": npi,
-            "organizationName": organization_name,
-            "address": address
-        }
+        self.service_facility = ServiceFacility(
+            npi=npi,
+            organizationName=_sanitize(organization_name),
+            **_address_fields(address)
+        )
+        self._facility_address_emitter = _select_address_emitter(self.service_facility)
 
     def add_prior_authorization(self, prior_auth_number: str) -> 'EDI837Builder':
         """
@@ -331,20 +686,18 @@ class EDI837Builder:
         Returns:
             The builder instance for method chaining
         """
-        claim_info = {
-            "subscriberIndex": subscriber_index,
-            "patientControlNumber": patient_control_number,
-            "claimChargeAmount": claim_charge_amount,
-            "placeOfServiceCode": place_of_service_code,
-            "claimFrequencyCode": claim_frequency_code,
-            "signatureIndicator": signature_indicator,
-            "planParticipationCode": plan_participation_code,
-            "releaseInfoCode": release_info_code,
-            "benefitsAssignment": benefits_assignment,
-            "diagnosisCodes": diagnosis_codes or []
-        }
-        
-        self.claim_information = claim_info
+        self.claim_information = ClaimInfo(
+            subscriberIndex=subscriber_index,
+            patientControlNumber=patient_control_number,
+            claimChargeAmount=claim_charge_amount,
+            placeOfServiceCode=place_of_service_code,
+            claimFrequencyCode=claim_frequency_code,
+            signatureIndicator=signature_indicator,
+            planParticipationCode=plan_participation_code,
+            releaseInfoCode=release_info_code,
+            benefitsAssignment=benefits_assignment,
+            diagnosisCodes=diagnosis_codes or []
+        )
 
     def add_service_line(self,
                         subscriber_index: int,
@@ -371,16 +724,16 @@ class EDI837Builder:
         Returns:
             int: Index of the service line in the internal list
         """
-        service_line = {
-            "subscriberIndex": subscriber_index,
-            "patientIndex": patient_index,
-            "procedureCode": procedure_code,
-            "modifierCodes": modifier_codes,
-            "chargeAmount": charge_amount,
-            "units": units,
-            "serviceDate": service_date,
-            "renderingProviderIndex": rendering_provider_index
-        }
+        service_line = ServiceLine(
+            subscriberIndex=subscriber_index,
+            patientIndex=patient_index,
+            procedureCode=_intern_code(procedure_code),
+            modifierCodes=[_intern_code(mod) for mod in modifier_codes],
+            chargeAmount=charge_amount,
+            units=units,
+            serviceDate=service_date,
+            renderingProviderIndex=rendering_provider_index
+        )
             
         self.service_lines.append(service_line)
         return len(self.service_lines) - 1
@@ -403,52 +756,33 @@ class EDI837Builder:
         Returns:
             int: Index of the rendering provider in the internal list
         """
-        if not hasattr(self, 'rendering_providers'):
-            self.rendering_providers = []
-                
-        provider = {
-            "npi": npi,
-            "lastName": last_name,
-            "firstName": first_name,
-            "taxonomyCode": taxonomy_code,
-            "employerId": employer_id
-        }
+        if taxonomy_code is None:
+            raise ValueError(f"Rendering provider {npi} is missing a taxonomy code")
+        
+        provider = RenderingProvider(
+            npi=npi,
+            lastName=_sanitize(last_name),
+            firstName=_sanitize(first_name),
+            taxonomyCode=_intern_code(taxonomy_code),
+            employerId=employer_id
+        )
             
         self.rendering_providers.append(provider)
         return len(self.rendering_providers) - 1
 
-    def _create_header(self) -> List[str]:
-        """Return the hardcoded header segments of the EDI file with proper name segments."""
-        # First part of the header with ISA, GS, ST, BHT segments
-        
-        interchange_control_header = "ISA*00*          *00*          *ZZ*AV09311993     *01*030240928      *240702*1531*^*00501*415133923*0*P*>~"
-        function_group_header = "GS*HC*1923294*030240928*20240702*1533*415133923*X*005010X222A1~"
-        transaction_set_header = "ST*837*415133923*005010X222A1~"
-        bht_header = "BHT*0019*00*1*20240702*1531*CH~"
-        submitter_name_segment = "NM1*41*2*Mattel Industries*****46*1234567890~"
-        submitter_contact_info_segment = "PER*IC*Ruth Handler*TE*8458130000~"
-        reciever_segment = "NM1*40*2*AVAILITY 5010*****46*030240928~"
-
-        hardcoded_header = [
-            interchange_control_header,
-            function_group_header,
-            transaction_set_header,
-            bht_header,
-            submitter_name_segment,
-            submitter_contact_info_segment,
-            reciever_segment
-        ]
-        return hardcoded_header
+    def _create_header(self) -> str:
+        """Return the hardcoded header segments of the EDI file, already joined."""
+        return _HEADER
     
-    def _create_billing_provider_loop(self, provider_index: int) -> List[str]:
-        """Create segments for a billing provider loop."""
+    def _create_billing_provider_loop(self, provider_index: int, out: _SegmentWriter) -> None:
+        """Append segments for a billing provider loop to out."""
         provider = self.billing_providers[provider_index]
         hardcoded_billing_provider_hl = "HL*1**20*1~"
         # Use hardcoded Hierarchical Level
-        segments = [
+        out += (
             hardcoded_billing_provider_hl,
-            f"{SegmentHeader.Provider.value}*{ProviderType.Billing.value}*{ReferenceIdentificationQualifier.TaxonomyCode.value}*{provider['taxonomyCode']}~",
-        ]
+            _PRV_BILLING_TMPL % provider.taxonomyCode,
+        )
 
         # Using the simplified name segment method with just entity data and context
         name_segment = self._create_name_segment(
@@ -456,165 +790,116 @@ class EDI837Builder:
             context='billing_provider'
         )
         if name_segment: 
-            segments.append(name_segment)
-            # Address segments
-            address2 = ""
-            if 'address2' in provider['address']:
-                address2 = provider['address']['address2']
-            segments.append(f"{SegmentHeader.AddressLine1.value}*{provider['address']['address1']}*{address2}~")
-            segments.append(
-                f"{SegmentHeader.CityStatePostalCode.value}*{provider['address']['city']}*{provider['address']['state']}*{provider['address']['postalCode']}~"
+            # Name and address segments
+            out += (
+                name_segment,
+                _N3_ADDR2_TMPL % (provider.address1, provider.address2),
+                _N4_TMPL % (provider.city, provider.state, provider.postalCode),
             )
         
         # Tax ID
-        segments.append(
-            f"{SegmentHeader.Reference.value}*{ReferenceIdentificationQualifier.EmployerIdentificationNumber.value}*{provider['employerId']}~"
-        )
+        out.append(_REF_EI_TMPL % provider.employerId)
         
         # Contact Info  
-        if "contactInfo" in provider: 
-            contactInfo = provider["contactInfo"] 
-            name = contactInfo.get("name", "")
-            phone_number = contactInfo.get("phoneNumber", "")
-            segments.append(
-                f"{SegmentHeader.ContactInformation.value}*IC*{name}*TE*{phone_number}~"
-            )
-        return segments
+        contactInfo = provider.contactInfo
+        if contactInfo is not None: 
+            get = contactInfo.get
+            out.append(_PER_TMPL % (get("name", ""), get("phoneNumber", "")))
 
-    def _create_subscriber_loop(self, subscriber_index: int) -> List[str]:
-        """Create segments for a subscriber loop."""
+    def _create_subscriber_loop(self, subscriber_index: int, out: _SegmentWriter) -> None:
+        """Append segments for a subscriber loop to out."""
         subscriber = self.subscribers[subscriber_index]
-        subscriber_count = len (self.subscribers) - 1
-        is_dependent = subscriber["is_dependent"]
-    
-        relationship = ''
-        # Subscriber Name using the new method
-        name_segment = self._create_name_segment(
-            entity_data=subscriber,
-            context='subscriber'
-        )
-        segments = []
+        # The subscriber only carries the patient details when no dependent follows
+        has_dependents = self.has_dependents
 
-        if is_dependent:
-            hardcoded_subscriber_hl = f"HL*3*2*23*0~"
-            segments.append(hardcoded_subscriber_hl)
-            responsibility_code =  PaymentResponsibilityLevelCode(subscriber['paymentResponsibilityLevelCode'])
+        if subscriber.is_dependent:
+            out.append(_HL_DEPENDENT)
             # Patient Name
-            if responsibility_code == PaymentResponsibilityLevelCode.Primary:
-                segments.append(f"PAT*01~")
-                segments.append(f"NM1*QC*1*{subscriber["lastName"]}*{subscriber["firstName"]}~")
-            
-            segments.append(
-                f"{SegmentHeader.AddressLine1.value}*{subscriber['address']['address1']}~"
-            )
-            segments.append(
-                f"{SegmentHeader.CityStatePostalCode.value}*{subscriber['address']['city']}*{subscriber['address']['state']}*{subscriber['address']['postalCode']}~"
-            )
-            # Demographics
-            segments.append(f"DMG*D8*{subscriber['birthDate']}*{subscriber['gender']}~")
+            if subscriber.paymentResponsibilityLevelCode == _PRIMARY:
+                out += (
+                    "PAT*01~",
+                    _NM1_PATIENT_TMPL % (subscriber.lastName, subscriber.firstName),
+                )
+            # Address and demographics
+            _emit_address_dmg(subscriber, out)
         else:           
-            hardcoded_subscriber_hl = f"HL*2*1*22*{subscriber_count}~"
-            segments.append(hardcoded_subscriber_hl)
-            relationship = '' if subscriber_count > 0 else RelationshipToSubscriber.Self.value
-            
-            # Add the subscriber header segment
-            segments.append(
-                f"{SegmentHeader.SubscriberInformation.value}*{subscriber['paymentResponsibilityLevelCode']}*{relationship}*******{subscriber['claimFilingCode']}~"
+            relationship = '' if has_dependents else _SELF
+            out += (
+                _HL_SUBSCRIBER_WITH_DEPENDENT if has_dependents else _HL_SUBSCRIBER,
+                # Subscriber header segment
+                _SBR_TMPL % (subscriber.paymentResponsibilityLevelCode, relationship, subscriber.claimFilingCode),
+                # Subscriber Name
+                self._create_name_segment(
+                    entity_data=subscriber,
+                    context='subscriber'
+                ),
             )
-            # Subscriber Name
-            segments.append(name_segment)
-            if subscriber_count == 0: 
-                segments.append(
-                        f"{SegmentHeader.AddressLine1.value}*{subscriber['address']['address1']}~"
-                    )
-                segments.append(
-                    f"{SegmentHeader.CityStatePostalCode.value}*{subscriber['address']['city']}*{subscriber['address']['state']}*{subscriber['address']['postalCode']}~"
-                )
-                # Demographics
-                segments.append(f"DMG*D8*{subscriber['birthDate']}*{subscriber['gender']}~")
-
-
-        return segments
+            if not has_dependents: 
+                # Address and demographics
+                _emit_address_dmg(subscriber, out)
    
-    def _create_claim_information_loop(self) -> List[str]:
-        """Create segments for claim information."""
-        if not hasattr(self, 'claim_information'):
-            return []
-        
+    def _create_claim_information_loop(self, out: _SegmentWriter) -> None:
+        """Append segments for claim information to out."""
         claim = self.claim_information
-        segments = []
-        # Harcoding the facility code is B for professional and dental
-        facility_code_qualifier = "B"
+        if claim is None:
+            return
+        
         # CLM segment
-        claim_segment = f"CLM*{claim['patientControlNumber']}*{claim['claimChargeAmount']}***"
-        claim_segment += f"{claim['placeOfServiceCode']}>{facility_code_qualifier}>{claim['claimFrequencyCode']}*"
-        claim_segment += f"{claim['signatureIndicator']}*{claim['planParticipationCode']}*"
-        claim_segment += f"{claim['releaseInfoCode']}*{claim['benefitsAssignment']}~"
-        segments.append(claim_segment)
+        out.append(_CLM_TMPL % (
+            claim.patientControlNumber,
+            claim.claimChargeAmount,
+            claim.placeOfServiceCode,
+            claim.claimFrequencyCode,
+            claim.signatureIndicator,
+            claim.planParticipationCode,
+            claim.releaseInfoCode,
+            claim.benefitsAssignment,
+        ))
         
         # Add prior authorization if present
-        if hasattr(self, 'prior_authorization'):
-            segments.append(f"REF*G1*{self.prior_authorization}~")
+        if self.prior_authorization is not None:
+            out.append(_REF_PRIOR_AUTH_TMPL % self.prior_authorization)
         
         # Add diagnosis codes if present
-        if claim['diagnosisCodes']:
-            diag_codes = []
-            for diag in claim['diagnosisCodes']:
-                diag_codes.append(f"{diag['diagnosisTypeCode']}>{diag['diagnosisCode']}")
-            segments.append(f"HI*{'>'.join(diag_codes)}~")
+        if claim.diagnosisCodes:
+            diag_codes = ">".join(
+                [_DIAGNOSIS_TMPL % (diag['diagnosisTypeCode'], diag['diagnosisCode']) for diag in claim.diagnosisCodes]
+            )
+            out.append(_HI_TMPL % diag_codes)
         
         # Add service facility if present
-        if hasattr(self, 'service_facility'):
-            segments.extend(self._create_service_facility_segments())
-            
-        return segments
+        if self.service_facility is not None:
+            self._create_service_facility_segments(out)
     
-    def _create_service_lines(self) -> List[str]:
-        """Create segments for service lines."""
-        if not self.service_lines:
-            return []
+    def _create_service_lines(self, out: _SegmentWriter) -> None:
+        """Append segments for service lines to out."""
+        # Bind loop invariants once; this loop runs per service line
+        emitters = _SERVICE_LINE_EMITTERS
+        rendering_providers = self.rendering_providers
+        rendering_count = len(rendering_providers)
         
-        segments = []
-        
-        for i, service in enumerate(self.service_lines):
-            # Service line number
-            segments.append(f"LX*{i+1}~")
-            
-            # Service line detail
-            sv1_segment = f"SV1*HC>{service['procedureCode']}"
-            if service.get('modifierCodes'):
-                for mod in service['modifierCodes']:
-                    sv1_segment += f":{mod}"
-            
-            sv1_segment += f"*{service['chargeAmount']}*UN*{service['units']}.0***1~"
-            segments.append(sv1_segment)
-            
-            # Service date
-            if service.get('serviceDate'):
-                segments.append(f"DTP*472*D8*{service['serviceDate']}~")
+        for number, service in enumerate(self.service_lines, 1):
+            # Service line number, detail and date, specialized on the line's shape
+            emit = emitters[(bool(service.modifierCodes), bool(service.serviceDate))]
+            emit(service, number, out)
             
             # Add rendering provider if present
-            if hasattr(self, 'rendering_providers') and service.get('renderingProviderIndex') is not None:
-                provider_idx = service['renderingProviderIndex']
-                if 0 <= provider_idx < len(self.rendering_providers):
-                    provider = self.rendering_providers[provider_idx]
+            provider_idx = service.renderingProviderIndex
+            if provider_idx is not None:
+                if 0 <= provider_idx < rendering_count:
+                    provider = rendering_providers[provider_idx]
                     name_segment = self._create_name_segment(
                         entity_data=provider,
                         context='rendering_provider'
                     )
                     if name_segment:
-                        segments.append(name_segment)
-                        segments.append(
-                            f"PRV*PE*PXC*{provider['taxonomyCode']}~"
-                        )
-        
-        return segments
+                        out.append(name_segment)
+                        out.append(_PRV_RENDERING_TMPL % provider.taxonomyCode)
     
-    def _create_service_facility_segments(self) -> List[str]:
-        """Create segments for service facility."""
-        segments = []
-        if not hasattr(self, 'service_facility'):
-            return segments
+    def _create_service_facility_segments(self, out: _SegmentWriter) -> None:
+        """Append segments for service facility to out."""
+        if self.service_facility is None:
+            return
         facility = self.service_facility
         
         # Service Facility Name - using simplified method
@@ -623,27 +908,13 @@ class EDI837Builder:
                 context='service_facility'
             )
         if name_segment: 
-            segments = []
-            segments.append(name_segment)
-            # Address
-            if 'address1' in facility['address']:
-                addr_line = f"N3*{facility['address']['address1']}"
-                if facility['address'].get('address2'):
-                    addr_line += f"*{facility['address']['address2']}"
-                segments.append(addr_line + "~")
-
-            # City, State, ZIP
-            if all(k in facility['address'] for k in ('city', 'state', 'postalCode')):
-                segments.append(
-                    f"N4*{facility['address']['city']}*{facility['address']['state']}*{facility['address']['postalCode']}~"
-                )
-            return segments
-        else:
-            return segments
+            out.append(name_segment)
+            # Address, using the emitter chosen when the facility was added
+            self._facility_address_emitter(facility, out)
     
     def _create_name_segment(
         self,
-        entity_data: Dict[str, Any],
+        entity_data: Any,
         context: str
     ) -> str:
         """
@@ -651,7 +922,7 @@ class EDI837Builder:
         This simplified version determines all necessary details based on context and entity data.
         
         Args:
-            entity_data: Dictionary containing entity information. Expected keys vary based on entity type:
+            entity_data: Record containing entity information. Expected attributes vary based on entity type:
                 - For persons: 'lastName', 'firstName', 'middleName', 'namePrefix', 'nameSuffix'
                 - For organizations: 'organizationName'
                 - Common: 'npi', 'memberId', 'payerId', 'taxonomyCode', etc.
@@ -668,208 +939,155 @@ class EDI837Builder:
         Returns:
             A formatted NM1 segment string ending with a segment terminator (~)
         """
-        # 1. Determine entity identifier code based on context
-        
-        entity_identifier_code = self._get_entity_identifier_code(context)
+        # 1. Look up everything that depends only on the context
+        entity_identifier_code, entity_type_qualifier, id_key, id_qualifier = _NAME_CTX.get(
+            context, _NAME_CTX_DEFAULT
+        )
         
+        # 2. Providers are only named once per NPI
+        if context in _PROVIDER_CTXS:
+            npi = getattr(entity_data, 'npi', '')
+            seen_provider_npis = self.seen_provider_npis
+            if not npi or npi in seen_provider_npis:
+                return None
+            seen_provider_npis.add(npi)
         
-        # 2. Determine if entity is a person or organization
-        entity_type_qualifier = self._determine_entity_type(entity_data, context)
+        # 3. Determine if entity is a person or organization
+        if entity_type_qualifier is None:
+            entity_type_qualifier = "2" if getattr(entity_data, 'organizationName', None) else "1"
         
-        proceed = self._can_create_provider(entity_data, context)
-        if proceed: 
-            # 3. Determine identification details (code and qualifier)
-            id_code, id_qualifier = self._get_identification_details(entity_data, context)
-            
-            # 4. Build the name segment
-            segment = f"{SegmentHeader.Name.value}*{entity_identifier_code}*{entity_type_qualifier}*"
-            
-            # 5. Add name details based on entity type
-            if entity_type_qualifier == "1":  # Person
-                segment += (
-                    f"{entity_data.get('lastName', '')}*"
-                    f"{entity_data.get('firstName', '')}*"
-                    f"{entity_data.get('middleName', '')}*"
-                    f"{entity_data.get('namePrefix', '')}*"
-                    f"{entity_data.get('nameSuffix', '')}*"
-                )
-            else:  # Non-person entity
-                segment += f"{entity_data.get('organizationName', '')}*****"
-            
-            # 6. Add identification code qualifier and code
-            segment += f"{id_qualifier}*{id_code}"
-            
-            # 7. Add segment terminator
-            segment += "~"
-            return segment
-        else:
-            return None
-
-    def _get_entity_identifier_code(self, context: str) -> str:
-        """Get the entity identifier code based on context."""
-        context_map = {
-            'billing_provider': EntityIdentifierCode.BillingProvider.value,
-            'subscriber': EntityIdentifierCode.Subscriber.value,
-            'patient': EntityIdentifierCode.Patient.value,
-            'submitter': EntityIdentifierCode.Submitter.value,
-            'receiver': EntityIdentifierCode.Receiver.value,
-            'rendering_provider': "82",  # Rendering Provider
-            'payer': "PR",               # Payer
-            'service_facility': "77",    # Service Facility
-        }
-        
-        return context_map.get(context, EntityIdentifierCode.BillingProvider.value)
-
-    def _determine_entity_type(self, entity_data: Dict[str, Any], context: str) -> str:
-        """
-        Determine if an entity is a person (1) or non-person entity (2).
+        # 4. Extract the identification code if the context has one
+        id_code = getattr(entity_data, id_key, '') if id_key else ''
         
-        Some contexts have a default entity type regardless of the data structure.
-        """
-        # These contexts are always non-person entities
-        if context in ['submitter', 'receiver', 'payer', 'service_facility']:
-            return "2"
-        
-        # These contexts are always person entities
-        if context in ['patient']:
-            return "1"
-        
-        # For other contexts, determine based on data structure
-        return "2" if "organizationName" in entity_data else "1"
-
-    def _can_create_provider(self, entity_data: Dict[str, Any], context: str) -> bool:
-        """ function to check if the provider npi was created before """
-        if context not in ["billing_provider", "rendering_provider", "service_facility"]:
-            return True
-        else: 
-            npi = entity_data.get("npi", '')
-            if not npi:  
-                return False
-            if npi in self.provider_map:
-                return False
-            else: 
-                self.provider_map[npi] = entity_data
-                return True
-
-    def _get_identification_details(
-        self, 
-        entity_data: Dict[str, Any],
-        context: str,
-    ) -> Tuple[str, str]:
-        """Get the identification code and qualifier based on context and entity type."""
-        # Map contexts to their identification details: (data_key, qualifier)
-        context_id_map = {
-            'billing_provider': ("npi", ReferenceIdentificationQualifier.NationalProviderIdentifier.value),
-            'rendering_provider': ("npi", ReferenceIdentificationQualifier.NationalProviderIdentifier.value),
-            'service_facility': ("npi", ReferenceIdentificationQualifier.NationalProviderIdentifier.value),
-            'subscriber': ("memberId", ReferenceIdentificationQualifier.MemberId.value),
-            'patient': (None, None),  # Patients typically don't need identification
-            'payer': ("payerId", "PI"),  # Payer ID
-            'submitter': (None, "46"),   # Submitter ID
-            'receiver': (None, "46"),    # Receiver ID
-        }
-        
-        # Get the appropriate field name and qualifier for this context
-        field_name, qualifier = context_id_map.get(context, (None, None))
-        
-        # For submitter and receiver, the ID is usually in a different field
-        if context in ['submitter', 'receiver']:
-            code = entity_data.get('id', '')
-            return code, qualifier
-        else:
-            # Extract the identification code from the entity data if field name is known
-            code = entity_data.get(field_name, '') if field_name else ''
-            return code, qualifier
+        # 5. Build the name segment based on entity type
+        if entity_type_qualifier == "1":  # Person
+            return _NM1_PERSON % (
+                entity_identifier_code,
+                getattr(entity_data, 'lastName', ''),
+                getattr(entity_data, 'firstName', ''),
+                getattr(entity_data, 'middleName', ''),
+                getattr(entity_data, 'namePrefix', ''),
+                getattr(entity_data, 'nameSuffix', ''),
+                id_qualifier,
+                id_code,
+            )
+        # Non-person entity
+        return _NM1_ORG % (
+            entity_identifier_code,
+            getattr(entity_data, 'organizationName', ''),
+            id_qualifier,
+            id_code,
+        )
 
-    def _create_patient_loop(self, patient_index: int) -> List[str]:
-        """Create segments for a patient loop."""
+    def _create_patient_loop(self, patient_index: int, out: _SegmentWriter) -> None:
+        """Append segments for a patient loop to out."""
         patient = self.patients[patient_index]
         
         name_segment = self._create_name_segment(
             entity_data=patient,
             context='patient'
         )
-        segments = [
-            # No hierarchical level here since we're using a fixed structure
-            # Patient Name
-            name_segment,
-            # Patient Address
-            f"{SegmentHeader.AddressLine1.value}*{patient['address']['address1']}~",
-            f"{SegmentHeader.CityStatePostalCode.value}*{patient['address']['city']}*{patient['address']['state']}*{patient['address']['postalCode']}~",
-            # Demographics
-            f"DMG*D8*{patient['birthDate']}*{patient['gender']}~"
-        ]
-        
-        return segments
+        # No hierarchical level here since we're using a fixed structure
+        # Patient Name
+        out.append(name_segment)
+        # Patient address and demographics
+        _emit_address_dmg(patient, out)
     
     def _create_payer(self) -> str: 
         """Create Payer Segment"""
-        payer_name = self.payer_info.get("organizationName", "")
-        payer_id = self.payer_info.get("payerId","")
-        payer_segment = f"{SegmentHeader.Name.value}*{SegmentHeader.Payer.value}*2*{payer_name}*****PI*{payer_id}~"
+        payer_info = self.payer_info
+        payer_segment = _NM1_PAYER_TMPL % (payer_info.organizationName, payer_info.payerId)
         
         return payer_segment
 
-    def _create_rendering_provider_segments(self) -> List[str]:
-        segments = []
+    def _create_rendering_provider_segments(self, out: _SegmentWriter) -> None:
         for rp in self.rendering_providers: 
             name_segment = self._create_name_segment(
                 entity_data=rp,
                 context='rendering_provider'
             )
             if name_segment: 
-                segments.append(name_segment)
+                out.append(name_segment)
                 # Creating Rendering Provider Specialty Information
-                segments.append(f"PRV*PE*PXC*{rp.get("taxonomyCode")}~")
-        
-        return segments
+                out.append(_PRV_RENDERING_TMPL % rp.taxonomyCode)
     
     def _create_trailer(self, segment_count: int) -> List[str]:
         """Return the hardcoded trailer segments of the EDI file."""
         # Using hardcoded trailer as specified
-        se_segment = f"SE*{segment_count}*415133923~"
         return [
-            se_segment,
-            "GE*1*415133923~",
-            "IEA*1*415133923~"
+            _SE_TMPL % segment_count,
+            _GE_SEGMENT,
+            _IEA_SEGMENT
         ]
     
-    def build(self) -> str:
+    def _emit(self, stream: TextIO) -> None:
         """
-        Build the complete EDI 837 file with enhanced claim information.
+        Write the complete EDI 837 file to a text stream in a single pass.
         
-        Returns:
-            str: The complete EDI 837 file as a string
+        Args:
+            stream: Any object with a write(str) method, such as an open file or io.StringIO
         """
-        segments = self._create_header()
+        out = _SegmentWriter(stream)
+        # Each document names every provider once, however often the builder is output
+        self.seen_provider_npis = set()
+        out.write_block(self._create_header(), _HEADER_SEGMENT_COUNT)
+        
+        subs_by_provider = self._subs_by_provider
+        has_payer = self.payer_info is not None
         
         # Process billing providers and their related subscribers
-        for provider_idx, _ in enumerate(self.billing_providers):
-            provider_segments = self._create_billing_provider_loop(provider_idx)
-            segments.extend(provider_segments)
+        for provider_idx in range(len(self.billing_providers)):
+            self._create_billing_provider_loop(provider_idx, out)
             
             # Add subscribers related to this billing provider
-            for sub_idx, subscriber in enumerate(self.subscribers):
-                if subscriber["billingProviderIndex"] == provider_idx:
-                    segments.extend(self._create_subscriber_loop(sub_idx))
-                    if self.payer_info and sub_idx == 0:
-                        segments.append(self._create_payer())
+            for sub_idx in subs_by_provider.get(provider_idx, ()):
+                self._create_subscriber_loop(sub_idx, out)
+                if has_payer and sub_idx == 0:
+                    out.append(self._create_payer())
             
             # Add claim information and service facility 
-            segments.extend(self._create_claim_information_loop())
+            self._create_claim_information_loop(out)
 
             # Add sercices lines
-            segments.extend(self._create_service_lines()) 
+            self._create_service_lines(out)
             # Add rendering provider
             if len(self.rendering_providers) > 0: 
                 # Creating rendering providers            
-                segments.extend(self._create_rendering_provider_segments())  
+                self._create_rendering_provider_segments(out)
             
         # Add trailer segments with hardcoded values
-        segments.extend(self._create_trailer(len(segments) -1 ))
-        segments = "\n".join(segments)
+        out.extend(self._create_trailer(out.count - 1))
+    
+    def build(self) -> str:
+        """
+        Build the complete EDI 837 file with enhanced claim information.
+        
+        Returns:
+            str: The complete EDI 837 file as a string
+        """
+        buf = io.StringIO()
+        self._emit(buf)
+        return buf.getvalue()
+    
+    def build_bytes(self, encoding: str = "ascii") -> bytes:
+        """
+        Build the complete EDI 837 file encoded for writing to a binary sink.
         
-        return segments
+        Args:
+            encoding: Character encoding of the output (EDI X12 is ASCII by default)
+        
+        Returns:
+            bytes: The complete EDI 837 file, ready for sockets or binary files
+        """
+        raw = io.BytesIO()
+        # newline='' writes "\n" separators untranslated, matching build()
+        stream = io.TextIOWrapper(raw, encoding=encoding, newline='')
+        self._emit(stream)
+        stream.flush()
+        data = raw.getvalue()
+        # Detach so closing the wrapper does not close the byte buffer under us
+        stream.detach()
+        return data
     
     def to_file(self, filename: str) -> None:
         """
@@ -878,6 +1096,6 @@ class EDI837Builder:
         Args:
             filename: Path to the output file
         """
-        with open(filename, 'w') as f:
-            f.write(self.build())
+        with open(filename, 'w', buffering=_FILE_BUFFER_SIZE) as f:
+            self._emit(f)
 
@@ -17,8 +17,6 @@ messages and stack traces if any issues occur during the conversion process.
 
 import json
 import sys
-import traceback
-from pathlib import Path
 from typing import Dict, Optional, Any, List
 from EDIService import (
     EDI837Builder, 
@@ -26,6 +24,36 @@ from EDIService import (
     PaymentResponsibilityLevelCode
 )
 
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
+
+# Claim filing indicator codes by their string value, bypassing Enum's value lookup
+_CFIC_BY_STR = {member.value: member for member in ClaimFilingIndicatorCode}
+
+def _intern_keys(obj: Any) -> Any:
+    """
+    Recursively replace every dict key in parsed JSON with its interned string.
+    
+    The converter looks keys up with string literals, which are interned, so
+    interned keys let those lookups match on identity instead of comparing characters.
+    """
+    if isinstance(obj, dict):
+        intern = sys.intern
+        return {intern(key): _intern_keys(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_intern_keys(item) for item in obj]
+    return obj
+
+def _as_float(value: Any) -> float:
+    """Return value as a float, skipping the conversion when it already is one."""
+    return value if type(value) is float else float(value)
+
+def _as_int(value: Any) -> int:
+    """Return value as an int, skipping the conversion when it already is one."""
+    return value if type(value) is int else int(value)
+
 class EDI837Converter:
     """Handles the conversion of JSON data to EDI 837P format."""
     
@@ -49,20 +77,26 @@ class EDI837Converter:
         # Process billing provider and get its index
         provider_idx = self._process_billing_provider(json_data.get("billing"))
         
+        # The claim filing code is shared by the subscriber and the dependent
+        claim_filing_code = self._determine_claim_filing_code(json_data)
+        
         # Process subscriber information
-        subscriber_idx = self._process_subscriber(json_data, provider_idx)
+        subscriber_idx = self._process_subscriber(json_data, provider_idx, claim_filing_code)
         
         # Process dependent if present
-        if "dependent" in json_data:
-            self._process_dependent(json_data["dependent"], json_data, provider_idx)
+        dependent_data = json_data.get("dependent")
+        if dependent_data is not None:
+            self._process_dependent(dependent_data, provider_idx, claim_filing_code)
         
         # Process claim information
-        if "claimInformation" in json_data:
-            self._process_claim_information(json_data["claimInformation"], subscriber_idx)
+        claim_data = json_data.get("claimInformation")
+        if claim_data is not None:
+            self._process_claim_information(claim_data, subscriber_idx)
         
         # Process rendering provider if present
-        if "rendering" in json_data:
-            self._process_rendering_provider(json_data["rendering"])
+        rendering_data = json_data.get("rendering")
+        if rendering_data is not None:
+            self._process_rendering_provider(rendering_data)
         
         return self.builder.build()
     
@@ -87,54 +121,52 @@ class EDI837Converter:
             contactInfo=provider_data.get("contactInformation")
         )
     
-    def _process_subscriber(self, data: Dict[str, Any], provider_idx: int) -> int:
+    def _process_subscriber(self, data: Dict[str, Any], provider_idx: int,
+                            claim_filing_code: ClaimFilingIndicatorCode) -> int:
         """Process subscriber information."""
-        subscriber_data = data.get("subscriber")
-        if not subscriber_data:
+        sd = data.get("subscriber")
+        if not sd:
             raise ValueError("Subscriber information is required")
-            
-        payment_code = self._determine_payment_code(subscriber_data)
-        claim_filing_code = self._determine_claim_filing_code(data)
-        gender = subscriber_data.get("gender", "U")
+        get = sd.get
         
         subscriber_idx = self.builder.add_subscriber(
-            member_id=subscriber_data["memberId"],
-            last_name=subscriber_data["lastName"],
-            first_name=subscriber_data["firstName"],
-            address=subscriber_data["address"],
-            birth_date=subscriber_data["dateOfBirth"],
-            gender=gender,
+            member_id=sd["memberId"],
+            last_name=sd["lastName"],
+            first_name=sd["firstName"],
+            address=sd["address"],
+            birth_date=sd["dateOfBirth"],
+            gender=get("gender", "U"),
             billing_provider_index=provider_idx,
-            payment_responsibility_code=payment_code,
+            payment_responsibility_code=self._determine_payment_code(sd),
             claim_filing_code=claim_filing_code,
             is_dependent=False,
-            relationship_to_subscriber=subscriber_data.get("relationshipToSubscriberCode", "")
+            relationship_to_subscriber=get("relationshipToSubscriberCode", "")
         )
         
         # Process payer if present
-        if "receiver" in data and "organizationName" in data["receiver"]:
-            self._process_payer(subscriber_idx, data["receiver"])
+        receiver = data.get("receiver")
+        if receiver is not None and "organizationName" in receiver:
+            self._process_payer(subscriber_idx, receiver)
             
         return subscriber_idx
     
-    def _process_dependent(self, dependent_data: Dict[str, Any], data: Dict[str, Any], provider_idx: int) -> None:
+    def _process_dependent(self, dd: Dict[str, Any], provider_idx: int,
+                           claim_filing_code: ClaimFilingIndicatorCode) -> None:
         """Process dependent subscriber information."""
-        payment_code = self._determine_payment_code(dependent_data)
-        claim_filing_code = self._determine_claim_filing_code(data)
-        gender = dependent_data.get("gender", "U")
+        get = dd.get
         
         self.builder.add_subscriber(
-            member_id=dependent_data["memberId"],
-            last_name=dependent_data["lastName"],
-            first_name=dependent_data["firstName"],
-            address=dependent_data["address"],
-            birth_date=dependent_data["dateOfBirth"],
-            gender=gender,
+            member_id=dd["memberId"],
+            last_name=dd["lastName"],
+            first_name=dd["firstName"],
+            address=dd["address"],
+            birth_date=dd["dateOfBirth"],
+            gender=get("gender", "U"),
             billing_provider_index=provider_idx,
-            payment_responsibility_code=payment_code,
+            payment_responsibility_code=self._determine_payment_code(dd),
             claim_filing_code=claim_filing_code,
             is_dependent=True,
-            relationship_to_subscriber=dependent_data.get("relationshipToSubscriberCode", "")
+            relationship_to_subscriber=get("relationshipToSubscriberCode", "")
         )
     
     def _process_claim_information(self, claim_data: Dict[str, Any], subscriber_idx: int) -> None:
@@ -143,16 +175,17 @@ class EDI837Converter:
         diagnosis_codes = self._extract_diagnosis_codes(claim_data)
         
         # Add claim information
+        get = claim_data.get
         self.builder.add_claim_information(
             subscriber_index=subscriber_idx,
             patient_control_number=claim_data["patientControlNumber"],
-            claim_charge_amount=float(claim_data["claimChargeAmount"]),
+            claim_charge_amount=_as_float(claim_data["claimChargeAmount"]),
             place_of_service_code=claim_data["placeOfServiceCode"],
-            claim_frequency_code=claim_data.get("claimFrequencyCode", "1"),
-            signature_indicator=claim_data.get("signatureIndicator", "Y"),
-            plan_participation_code=claim_data.get("planParticipationCode", "A"),
-            release_info_code=claim_data.get("releaseInformationCode", "Y"),
-            benefits_assignment=claim_data.get("benefitsAssignmentCertificationIndicator", "Y"),
+            claim_frequency_code=get("claimFrequencyCode", "1"),
+            signature_indicator=get("signatureIndicator", "Y"),
+            plan_participation_code=get("planParticipationCode", "A"),
+            release_info_code=get("releaseInformationCode", "Y"),
+            benefits_assignment=get("benefitsAssignmentCertificationIndicator", "Y"),
             diagnosis_codes=diagnosis_codes
         )
         
@@ -163,8 +196,9 @@ class EDI837Converter:
         self._process_service_facility(claim_data)
         
         # Process service lines
-        if "serviceLines" in claim_data:
-            self._process_service_lines(claim_data["serviceLines"], subscriber_idx)
+        service_lines = get("serviceLines")
+        if service_lines is not None:
+            self._process_service_lines(service_lines, subscriber_idx)
     
     def _process_rendering_provider(self, provider_data: Dict[str, Any]) -> None:
         """Process rendering provider information."""
@@ -200,15 +234,16 @@ class EDI837Converter:
     
     def _process_service_lines(self, service_lines: List[Dict[str, Any]], subscriber_idx: int) -> None:
         """Process service lines information."""
-        for service_line in service_lines:
-            if "professionalService" in service_line:
-                service = service_line["professionalService"]
+        builder = self.builder
+        for sl in service_lines:
+            service = sl.get("professionalService")
+            if service is not None:
                 rendering_provider_idx = None
                 
                 # Process rendering provider if present
-                if "renderingProvider" in service_line:
-                    provider = service_line["renderingProvider"]
-                    rendering_provider_idx = self.builder.add_rendering_provider(
+                provider = sl.get("renderingProvider")
+                if provider is not None:
+                    rendering_provider_idx = builder.add_rendering_provider(
                         npi=provider["npi"],
                         last_name=provider["lastName"],
                         first_name=provider["firstName"],
@@ -217,14 +252,14 @@ class EDI837Converter:
                     )
                 
                 # Add the service line
-                self.builder.add_service_line(
+                builder.add_service_line(
                     subscriber_index=subscriber_idx,
                     patient_index=None,
                     procedure_code=service["procedureCode"],
                     modifier_codes=[],
-                    charge_amount=float(service["lineItemChargeAmount"]),
-                    units=int(service["serviceUnitCount"]),
-                    service_date=service_line["serviceDate"],
+                    charge_amount=_as_float(service["lineItemChargeAmount"]),
+                    units=_as_int(service["serviceUnitCount"]),
+                    service_date=sl["serviceDate"],
                     rendering_provider_index=rendering_provider_idx
                 )
     
@@ -240,8 +275,11 @@ class EDI837Converter:
     
     def _determine_claim_filing_code(self, data: Dict[str, Any]) -> ClaimFilingIndicatorCode:
         """Determine claim filing code from claim information."""
-        if "claimInformation" in data and "claimFilingCode" in data["claimInformation"]:
-            return ClaimFilingIndicatorCode(data["claimInformation"]["claimFilingCode"].upper())
+        claim_info = data.get("claimInformation")
+        if claim_info is not None:
+            code = claim_info.get("claimFilingCode")
+            if code is not None:
+                return _CFIC_BY_STR.get(code.upper(), ClaimFilingIndicatorCode.Unknown)
         return ClaimFilingIndicatorCode.Unknown
     
     def _extract_diagnosis_codes(self, claim_data: Dict[str, Any]) -> List[Dict[str, str]]:
@@ -267,8 +305,13 @@ def convert_json_to_edi(json_file_path: str, output_file_path: Optional[str] = N
         The EDI content as a string
     """
     # Load JSON data
-    with open(json_file_path, 'r') as file:
-        data = json.load(file)
+    if orjson is not None:
+        with open(json_file_path, 'rb') as file:
+            data = orjson.loads(file.read())
+    else:
+        with open(json_file_path, 'r') as file:
+            data = json.load(file)
+    data = _intern_keys(data)
     
     # Convert using the converter class
     converter = EDI837Converter()
@@ -308,6 +351,7 @@ def main():
         print("\nGenerated EDI content:")
         print(edi_content)
     except Exception as e:
+        import traceback
         print(f"Error: {e}")
         traceback.print_exc()
 
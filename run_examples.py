@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 
-import os
+import re
+import shutil
 import subprocess
-import sys
+import time
 from pathlib import Path
-from datetime import datetime
 
 # ANSI color codes
 COLORS = {
@@ -40,28 +40,36 @@ def ensure_diff_dir():
     diff_dir.mkdir(exist_ok=True)
     return diff_dir
 
+# Diff command with color support, resolved once: colordiff if installed, else diff.
+# Color is forced because the output is captured rather than sent to a terminal.
+_DIFF_CMD = ['colordiff'] if shutil.which('colordiff') else ['diff', '--color=always']
+
+# ANSI escape sequences, stripped from the diff before it is saved to a file
+_ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+
 def get_diff_command():
     """Get the appropriate diff command with color support."""
-    # Try colordiff first
-    if subprocess.run(['which', 'colordiff'], capture_output=True).returncode == 0:
-        return ['colordiff']
-    # Fall back to diff with color
-    return ['diff', '--color=auto']
+    return _DIFF_CMD
 
-def run_conversion_and_compare(json_file, edi_file):
+def run_conversion_and_compare(json_file: Path, edi_file: Path):
     """Run the JSON to EDI conversion and compare with example file."""
-    json_name = os.path.basename(json_file)
+    json_name = json_file.name
+    json_stem = json_file.stem
     print_header(f"Processing {json_name}")
     
     # Create a unique output filename based on the input file
-    output_file = f"output_{os.path.splitext(json_name)[0]}.837"
+    output_file = f"output_{json_stem}.837"
     
     # Run the conversion
     try:
-        subprocess.run([sys.executable, "json_to_edi.py", json_file, output_file], check=True)
+        # Imported here so a broken converter is reported per example
+        from json_to_edi import convert_json_to_edi
+        convert_json_to_edi(json_file, output_file)
         print_success("Conversion completed successfully")
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
+        import traceback
         print_error(f"Conversion failed: {e}")
+        traceback.print_exc()
         return
 
     # Compare with example file
@@ -74,23 +82,15 @@ def run_conversion_and_compare(json_file, edi_file):
             print_warning("Generated file differs from example file:")
             print("\nDifferences found:")
             print("-" * 80)
-            # Use subprocess.Popen to preserve color output
-            diff_process = subprocess.Popen(
-                diff_cmd + [output_file, edi_file],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-            diff_output, _ = diff_process.communicate()
-            print(diff_output)
+            print(result.stdout)
             print("-" * 80)
             
             # Save the differences to a file in the diffs directory
             diff_dir = ensure_diff_dir()
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            diff_file = diff_dir / f"diff_{os.path.splitext(json_name)[0]}_{timestamp}.txt"
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
+            diff_file = diff_dir / f"diff_{json_stem}_{timestamp}.txt"
             with open(diff_file, "w") as f:
-                f.write(result.stdout)
+                f.write(_ANSI_ESCAPE.sub('', result.stdout))
             print(f"\nDifferences saved to: {COLORS['blue']}{diff_file}{COLORS['reset']}")
     except subprocess.CalledProcessError as e:
         print_error(f"Comparison failed: {e}")
@@ -118,7 +118,7 @@ def main():
             print_error(f"Missing files for {json_file}")
             continue
 
-        run_conversion_and_compare(str(json_path), str(edi_path))
+        run_conversion_and_compare(json_path, edi_path)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -8,17 +8,17 @@ setup(
     author_email="chiragghelani@gmail.com",
     packages=find_packages(),
     install_requires=[
-        "pydantic>=2.0.0",
         "python-dateutil>=2.8.2",
     ],
-    python_requires=">=3.8",
+    extras_require={
+        "fast": ["orjson>=3.0"],
+    },
+    python_requires=">=3.10",
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Healthcare Industry",
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.8",
-        "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
         "Topic :: Software Development :: Libraries :: Python Modules",